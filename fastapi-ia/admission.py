@@ -0,0 +1,98 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Limites des générations T5 simultanées (variables d'environnement)
+MODEL_MAX_CONCURRENCY = int(os.getenv("MODEL_MAX_CONCURRENCY", "2"))
+MODEL_MAX_QUEUE = int(os.getenv("MODEL_MAX_QUEUE", "8"))
+MODEL_MAX_WAIT = float(os.getenv("MODEL_MAX_WAIT", "10"))
+MODEL_RETRY_AFTER = int(os.getenv("MODEL_RETRY_AFTER", "5"))
+
+
+class Overloaded(Exception):
+    def __init__(self, reason, retry_after=MODEL_RETRY_AFTER):
+        super().__init__(f"Modèle surchargé : {reason}")
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    # Sémaphore borné devant le modèle avec une file d'attente limitée en taille et en durée.
+    # Seules les requêtes qui atteignent T5 passent par ici : les réponses par règles ne sont jamais
+    # mises en attente, et la file bornée laisse toujours des threads libres pour elles.
+    def __init__(self, max_concurrency=MODEL_MAX_CONCURRENCY, max_queue=MODEL_MAX_QUEUE, max_wait=MODEL_MAX_WAIT, retry_after=MODEL_RETRY_AFTER):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.retry_after = retry_after
+        self.active = 0
+        self.waiting = 0
+        self._cond = threading.Condition()
+        self.stats = {"requests": 0, "admitted": 0, "rejected": 0, "timed_out": 0, "degraded": 0}
+
+    @contextmanager
+    def slot(self):
+        with self._cond:
+            self.stats["requests"] += 1
+            if self.active >= self.max_concurrency:
+                if self.waiting >= self.max_queue:
+                    self.stats["rejected"] += 1
+                    raise Overloaded("file d'attente pleine", self.retry_after)
+                self.waiting += 1
+                deadline = time.monotonic() + self.max_wait
+                try:
+                    while self.active >= self.max_concurrency:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.stats["timed_out"] += 1
+                            raise Overloaded("délai d'attente dépassé", self.retry_after)
+                        self._cond.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            self.active += 1
+            self.stats["admitted"] += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.active -= 1
+                self._cond.notify()
+
+    def record_degraded(self):
+        with self._cond:
+            self.stats["degraded"] += 1
+
+    def snapshot(self):
+        with self._cond:
+            refused = self.stats["rejected"] + self.stats["timed_out"]
+            return dict(
+                self.stats,
+                active=self.active,
+                queue_depth=self.waiting,
+                max_concurrency=self.max_concurrency,
+                max_queue=self.max_queue,
+                rejection_rate=refused / self.stats["requests"] if self.stats["requests"] else 0.0,
+            )
+
+
+class AnswerCache:
+    # Dernières réponses du modèle, servies en mode dégradé quand il est surchargé
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._answers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            answer = self._answers.get(key)
+            if answer is not None:
+                self._answers.move_to_end(key)
+            return answer
+
+    def put(self, key, answer):
+        with self._lock:
+            self._answers[key] = answer
+            self._answers.move_to_end(key)
+            while len(self._answers) > self.max_size:
+                self._answers.popitem(last=False)
@@ -0,0 +1,66 @@
+import logging
+import os
+import threading
+
+from transformers import T5ForConditionalGeneration, T5TokenizerFast
+
+from profiling import profiler
+from prompt import PromptBuilder
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_PATH = "./models/fine_tuned_t5"
+BASE_MODEL = "google/flan-t5-base"
+
+
+def resolve_model_path(model_path=DEFAULT_MODEL_PATH):
+    # Repli sur le modèle de base si le modèle fine-tuné n'existe pas localement
+    if os.path.exists(model_path) or model_path != DEFAULT_MODEL_PATH:
+        return model_path
+    logger.warning(f"Le dossier du modèle fine-tuné {model_path} n'existe pas. Utilisation de {BASE_MODEL}.")
+    return BASE_MODEL
+
+
+class T5Backend:
+    # Tokenizer, modèle, cache de prompts et paramètres de génération d'un checkpoint T5
+    def __init__(self, model_path=DEFAULT_MODEL_PATH, num_beams=5, max_input_length=512):
+        self.model_path = resolve_model_path(model_path)
+        self.num_beams = num_beams
+        try:
+            self.tokenizer = T5TokenizerFast.from_pretrained(self.model_path, legacy=True)
+            self.model = T5ForConditionalGeneration.from_pretrained(self.model_path)
+            self.model.eval()
+            logger.info(f"Modèle chargé depuis : {self.model_path}")
+        except Exception as e:
+            logger.error(f"Erreur lors du chargement du modèle : {e}")
+            raise
+        self.prompt_builder = PromptBuilder(self.tokenizer, max_length=max_input_length)
+
+    @property
+    def name(self):
+        return f"{self.model_path} (num_beams={self.num_beams})"
+
+    def generate(self, inputs, max_length=150, num_beams=None):
+        with profiler.torch("generate"):
+            outputs = self.model.generate(
+                **inputs,
+                max_length=max_length,
+                num_return_sequences=1,
+                no_repeat_ngram_size=2,
+                num_beams=num_beams or self.num_beams,
+            )
+        return self.tokenizer.decode(outputs[0], skip_special_tokens=True).strip()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    # Backend de service, chargé une seule fois
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = T5Backend()
+    return _backend
@@ -0,0 +1,32 @@
+import asyncio
+
+
+def request_key(endpoint, version, query="", filter_period=None):
+    # Clé de déduplication : endpoint + version du jeu de données + question normalisée
+    # (minuscules, espaces réduits) + période. Seuls ces champs influent sur la réponse (la langue
+    # est toujours forcée à 'fr') : les lignes du jeu de données ne sont jamais re-sérialisées ici,
+    # leur empreinte est déjà calculée hors de la boucle d'événements
+    return endpoint, version, " ".join(query.lower().split()), filter_period
+
+
+class SingleFlight:
+    # Les appels concurrents ayant la même clé attendent un seul calcul en cours et partagent son résultat
+    def __init__(self):
+        self._inflight = {}
+        self.stats = {"calls": 0, "executed": 0, "coalesced": 0}
+
+    async def run(self, key, compute):
+        self.stats["calls"] += 1
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            self.stats["executed"] += 1
+            # Tâche indépendante de l'appelant : l'annulation d'un client n'interrompt pas les autres
+            task = asyncio.ensure_future(compute())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def snapshot(self):
+        return dict(self.stats, inflight=len(self._inflight))
@@ -0,0 +1,225 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.getenv("DATA_DIR", "./data")
+# Cache Parquet de DATA_DIR ; toute autre source a le sien dans son propre dossier .parquet
+CACHE_DIR = os.getenv("DATA_CACHE_DIR", os.path.join(DATA_DIR, ".parquet"))
+# Intervalle minimal (secondes) entre deux vérifications des CSV sources pendant le service
+SYNC_INTERVAL = float(os.getenv("DATA_SYNC_INTERVAL", "60"))
+
+# Tables sources, dans l'ordre renvoyé par extract_data() ; les trois dernières sont optionnelles
+TABLES = ["projet", "tache_projet", "agent", "equipe", "statut_projet", "statut_tache", "societe"]
+REQUIRED_TABLES = {"projet", "tache_projet", "agent", "equipe"}
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def typed_frame(df, table=None):
+    # Typage explicite : colonnes date_* en datetime64, le reste selon l'inférence de pandas.
+    # ISO 8601 d'abord, puis inférence valeur par valeur pour les autres formats (01/03/2023...) ;
+    # les valeurs qui restent illisibles deviennent NaT et sont comptées dans le journal
+    for column in df.columns:
+        if column.startswith("date_"):
+            source = df[column]
+            parsed = pd.to_datetime(source, errors="coerce", format="ISO8601")
+            retry = parsed.isna() & source.notna()
+            if retry.any():
+                parsed[retry] = pd.to_datetime(source[retry], errors="coerce", format="mixed")
+                coerced = int((parsed.isna() & source.notna()).sum())
+                if coerced:
+                    logger.warning(f"Table {table} : {coerced} valeur(s) illisible(s) dans {column} remplacée(s) par NaT")
+            df[column] = parsed
+    return df
+
+
+def default_cache_dir(source_dir):
+    if os.path.abspath(source_dir) == os.path.abspath(DATA_DIR):
+        return CACHE_DIR
+    return os.path.join(source_dir, ".parquet")
+
+
+def iso_date(value):
+    # Date sérialisée au format ISO (YYYY-MM-DD) ; None pour les valeurs manquantes (NaN, NaT)
+    if value is None or pd.isna(value):
+        return None
+    if isinstance(value, str):
+        return value
+    return pd.Timestamp(value).strftime("%Y-%m-%d")
+
+
+def atomic_write(path, write):
+    # Écrit dans un fichier temporaire du même dossier puis le met en place d'un seul coup :
+    # un lecteur concurrent voit l'ancienne ou la nouvelle version, jamais un fichier partiel
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_json(data, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+
+class LocalDataLayer:
+    # Convertit une fois chaque CSV en Parquet typé et le réutilise tant que la source est inchangée
+    # (mtime et taille, puis empreinte SHA-256 si le mtime a bougé)
+    def __init__(self, source_dir=DATA_DIR, cache_dir=None, max_workers=None, sync_interval=SYNC_INTERVAL):
+        self.source_dir = source_dir
+        self.cache_dir = cache_dir or default_cache_dir(source_dir)
+        self.max_workers = max_workers or len(TABLES)
+        self.sync_interval = sync_interval
+        self._manifest_path = os.path.join(self.cache_dir, "manifest.json")
+        self._lock = threading.Lock()
+        self._synced_at = float("-inf")
+
+    def _source_path(self, table):
+        return os.path.join(self.source_dir, f"{table}.csv")
+
+    def _parquet_path(self, table):
+        return os.path.join(self.cache_dir, f"{table}.parquet")
+
+    def _read_manifest(self):
+        if not os.path.exists(self._manifest_path):
+            return {}
+        with open(self._manifest_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _sync_table(self, table, manifest):
+        source = self._source_path(table)
+        if not os.path.exists(source):
+            if table in REQUIRED_TABLES:
+                raise FileNotFoundError(f"Table source manquante : {source}")
+            # Source optionnelle supprimée : le Parquet correspondant ne doit plus être servi
+            parquet_path = self._parquet_path(table)
+            if os.path.exists(parquet_path):
+                os.remove(parquet_path)
+                logger.info(f"Table {table} supprimée du cache : source absente")
+            return table, None
+        stat = os.stat(source)
+        entry = manifest.get(table)
+        parquet_path = self._parquet_path(table)
+        if entry and os.path.exists(parquet_path):
+            if entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+                return table, entry
+            source_hash = file_hash(source)
+            if entry["sha256"] == source_hash:
+                return table, dict(entry, mtime=stat.st_mtime)
+        else:
+            source_hash = file_hash(source)
+        df = typed_frame(pd.read_csv(source), table)
+        table_data = pa.Table.from_pandas(df, preserve_index=False)
+        atomic_write(parquet_path, lambda path: pq.write_table(table_data, path))
+        logger.info(f"Table {table} convertie en Parquet : {len(df)} lignes")
+        return table, {"mtime": stat.st_mtime, "size": stat.st_size, "sha256": source_hash, "rows": len(df)}
+
+    def sync(self):
+        # Conversion parallèle des tables dont la source a changé ; retourne le manifeste à jour
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with self._lock:
+            previous = self._read_manifest()
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                results = list(executor.map(lambda table: self._sync_table(table, previous), TABLES))
+            manifest = {table: entry for table, entry in results if entry is not None}
+            # Manifeste réécrit seulement si une entrée a changé
+            if manifest != previous:
+                atomic_write(self._manifest_path, lambda path: write_json(manifest, path))
+            self._synced_at = time.monotonic()
+        return manifest
+
+    def maybe_sync(self):
+        # Vérification des sources au plus une fois par intervalle (sync() complet au démarrage)
+        if time.monotonic() - self._synced_at >= self.sync_interval:
+            self.sync()
+
+    def load(self, table, columns=None):
+        # Lecture en mémoire mappée, limitée aux colonnes demandées
+        path = self._parquet_path(table)
+        if not os.path.exists(path):
+            return pd.DataFrame()
+        return pq.read_table(path, columns=columns, memory_map=True).to_pandas()
+
+    def extract_data(self, columns=None):
+        # Même contrat que extract_data() : 7 DataFrames, vides pour les tables optionnelles absentes.
+        # `columns` : {table: [colonnes]} pour ne charger que le nécessaire
+        self.maybe_sync()
+        columns = columns or {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            frames = list(executor.map(lambda table: self.load(table, columns.get(table)), TABLES))
+        projects_df, tasks_df, agents_df, equipes_df = frames[:4]
+        logger.info(f"Données locales chargées : {len(projects_df)} projets, {len(tasks_df)} tâches, {len(agents_df)} agents, {len(equipes_df)} équipes")
+        return tuple(frames)
+
+    def clear(self):
+        with self._lock:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+            self._synced_at = float("-inf")
+
+
+def benchmark(source_dir=DATA_DIR, repeat=3):
+    # Temps de chargement : CSV brut, cache Parquet froid (conversion) et chaud (réutilisation)
+    def timed(fn):
+        started = time.perf_counter()
+        fn()
+        return time.perf_counter() - started
+
+    def read_csvs():
+        for table in TABLES:
+            path = os.path.join(source_dir, f"{table}.csv")
+            if os.path.exists(path):
+                pd.read_csv(path)
+
+    cache_dir = os.path.join(source_dir, ".parquet-benchmark")
+    # Intervalle nul : chaque chargement vérifie les sources, comme le ferait un premier appel
+    layer = LocalDataLayer(source_dir, cache_dir, sync_interval=0)
+    results = {"csv": [], "cold": [], "warm": []}
+    try:
+        for _ in range(repeat):
+            results["csv"].append(timed(read_csvs))
+            layer.clear()
+            results["cold"].append(timed(layer.extract_data))
+            results["warm"].append(timed(layer.extract_data))
+    finally:
+        layer.clear()
+    for name, values in results.items():
+        print(f"{name:>5} : min {min(values) * 1000:.1f} ms, moyenne {sum(values) / len(values) * 1000:.1f} ms")
+    return results
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Cache Parquet des tables CSV")
+    parser.add_argument("--source-dir", default=DATA_DIR)
+    parser.add_argument("--benchmark", action="store_true", help="Mesurer les chargements CSV, à froid et à chaud")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    if args.benchmark:
+        benchmark(args.source_dir, args.repeat)
+    else:
+        manifest = LocalDataLayer(args.source_dir).sync()
+        print(json.dumps(manifest, indent=2))
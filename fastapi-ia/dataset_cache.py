@@ -0,0 +1,105 @@
+import os
+import threading
+import uuid
+from collections import OrderedDict
+
+from fastapi.encoders import jsonable_encoder
+
+from store import ProjectStore, data_version
+
+# Nombre maximal de jeux de données conservés en mémoire (éviction LRU)
+DATASET_CACHE_SIZE = int(os.getenv("DATASET_CACHE_SIZE", "32"))
+
+
+def dataset_version(projects, tasks, agents=None, equipes=None):
+    # Empreinte des lignes normalisées, calculable sans construire les index pandas
+    return data_version(projects, tasks, jsonable_encoder(agents or []), jsonable_encoder(equipes or []))
+
+
+class Dataset:
+    # Données normalisées d'un client et index dérivés, réutilisés entre les requêtes
+    def __init__(self, projects, tasks, agents=None, equipes=None, version=None):
+        self.projects = projects
+        self.tasks = tasks
+        self.agents = agents or []
+        self.equipes = equipes or []
+        self.store = ProjectStore(projects, tasks)
+        # Calculée à la construction (build_dataset / apply_delta, exécutés hors de la boucle d'événements)
+        # sauf si l'appelant l'a déjà calculée pour dédupliquer la requête
+        self.version = version or dataset_version(projects, tasks, self.agents, self.equipes)
+
+    def apply_delta(self, projects=(), tasks=(), deleted_project_ids=(), deleted_task_ids=(), agents=None, equipes=None):
+        # Nouveau jeu de données : lignes ajoutées/remplacées par id, lignes supprimées, listes agents/équipes remplacées
+        def merge(rows, upserts, deleted_ids):
+            by_id = {row["id"]: row for row in rows}
+            for row_id in deleted_ids:
+                by_id.pop(row_id, None)
+            for row in upserts:
+                by_id[row["id"]] = row
+            return list(by_id.values())
+
+        return Dataset(
+            merge(self.projects, projects, deleted_project_ids),
+            merge(self.tasks, tasks, deleted_task_ids),
+            self.agents if agents is None else agents,
+            self.equipes if equipes is None else equipes,
+        )
+
+
+class VersionConflict(Exception):
+    def __init__(self, current_version):
+        super().__init__(f"Version du jeu de données modifiée entre-temps : {current_version}")
+        self.current_version = current_version
+
+
+class DatasetCache:
+    def __init__(self, max_size=DATASET_CACHE_SIZE):
+        self.max_size = max_size
+        self._datasets = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"created": 0, "updated": 0, "hits": 0, "misses": 0, "evicted": 0}
+
+    def add(self, dataset):
+        dataset_id = uuid.uuid4().hex
+        with self._lock:
+            self.stats["created"] += 1
+            self._store(dataset_id, dataset)
+        return dataset_id
+
+    def replace(self, dataset_id, dataset, base_version):
+        # Remplacement conditionnel (vérification et écriture sous le verrou) : le delta doit avoir été
+        # appliqué à la version encore en cache, sinon une mise à jour concurrente serait perdue
+        with self._lock:
+            current = self._datasets.get(dataset_id)
+            if current is None:
+                return False
+            if current.version != base_version:
+                raise VersionConflict(current.version)
+            self.stats["updated"] += 1
+            self._store(dataset_id, dataset)
+            return True
+
+    def _store(self, dataset_id, dataset):
+        self._datasets[dataset_id] = dataset
+        self._datasets.move_to_end(dataset_id)
+        while len(self._datasets) > self.max_size:
+            self._datasets.popitem(last=False)
+            self.stats["evicted"] += 1
+
+    def get(self, dataset_id):
+        with self._lock:
+            dataset = self._datasets.get(dataset_id)
+            if dataset is None:
+                self.stats["misses"] += 1
+                return None
+            self._datasets.move_to_end(dataset_id)
+            self.stats["hits"] += 1
+            return dataset
+
+    def remove(self, dataset_id):
+        with self._lock:
+            return self._datasets.pop(dataset_id, None) is not None
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, size=len(self._datasets), max_size=self.max_size)
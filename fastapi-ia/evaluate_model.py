@@ -0,0 +1,229 @@
+import argparse
+import json
+import logging
+import string
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException
+
+from backend import DEFAULT_MODEL_PATH, T5Backend
+from data_layer import iso_date
+from main import AnalysisRequest, Project, StatutProjet, Task, run_analysis
+from train_model import SPLIT_SEED, TEST_SIZE, extract_data, prepare_dataset, split_dataset
+
+logger = logging.getLogger(__name__)
+
+STAGES = ["prepare", "rules", "prompt", "generate", "total"]
+PUNCTUATION = set(string.punctuation)
+
+
+def _value(value):
+    return None if pd.isna(value) else value
+
+
+# Conversion des tables CSV vers le format envoyé par le frontend
+def build_payload(projects_df, tasks_df, statut_projet_df):
+    statut_names = {}
+    if not statut_projet_df.empty and {"id", "nom"} <= set(statut_projet_df.columns):
+        statut_names = dict(zip(statut_projet_df["id"], statut_projet_df["nom"]))
+    projects = [
+        Project(
+            id=int(p["id"]),
+            nomProjet=str(p["nom_projet"]),
+            dateDebut=iso_date(p.get("date_debut")),
+            dateFin=iso_date(p.get("date_fin")),
+            statutProjet=StatutProjet(nom=_value(statut_names.get(p.get("statut_id"), p.get("statut_id")))),
+            budget=float(_value(p.get("budget")) or 0.0),
+            archived=bool(_value(p.get("archived")) or False),
+            equipe_id=int(p["equipe_id"]) if _value(p.get("equipe_id")) is not None else None,
+        )
+        for _, p in projects_df.iterrows()
+    ]
+    tasks = [
+        Task(
+            id=int(t["id"]),
+            idProjet=int(t["id_projet"]),
+            dateDebut=iso_date(t.get("date_debut")),
+            dateFin=iso_date(t.get("date_fin")),
+            idStatutTache=int(t["id_statut_tache"]) if _value(t.get("id_statut_tache")) is not None else None,
+            assigne=str(t["assigne"]) if _value(t.get("assigne")) is not None else None,
+            titre=_value(t.get("titre")),
+        )
+        for _, t in tasks_df.iterrows()
+    ]
+    return projects, tasks
+
+
+# Chargement d'un corpus de requêtes réelles : une question par ligne, ou JSONL {"query": ..., "answer": ...}
+def load_queries(path):
+    examples = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if path.endswith(".jsonl"):
+                record = json.loads(line)
+                examples.append({"question": record["query"], "answer": record.get("answer"), "source": "corpus"})
+            else:
+                examples.append({"question": line, "answer": None, "source": "corpus"})
+    return examples
+
+
+# Métriques de type SQuAD : correspondance exacte et F1 sur les tokens normalisés
+def normalize_answer(text):
+    text = text.lower()
+    text = "".join(ch for ch in text if ch not in PUNCTUATION)
+    return " ".join(text.split())
+
+
+def exact_match(prediction, answer):
+    return float(normalize_answer(prediction) == normalize_answer(answer))
+
+
+def f1_score(prediction, answer):
+    pred_tokens = normalize_answer(prediction).split()
+    answer_tokens = normalize_answer(answer).split()
+    common = Counter(pred_tokens) & Counter(answer_tokens)
+    overlap = sum(common.values())
+    if not pred_tokens or not answer_tokens or overlap == 0:
+        return float(pred_tokens == answer_tokens)
+    precision = overlap / len(pred_tokens)
+    recall = overlap / len(answer_tokens)
+    return 2 * precision * recall / (precision + recall)
+
+
+# Les règles répondent par une phrase complète alors que le jeu de données attend la valeur seule :
+# la route « rule » est notée sur la valeur de structured_data quand elle en porte une
+STRUCTURED_ANSWERS = [
+    ("task_count", str),
+    ("delayed_tasks", str),
+    ("delayed_projects", str),
+    ("equipe_count", str),
+    ("total_budget", lambda v: f"{v:.2f} $"),
+    ("budget", lambda v: f"{v:.2f} $"),
+]
+
+
+def rule_answer(result):
+    data = result.get("structured_data") or {}
+    for field, fmt in STRUCTURED_ANSWERS:
+        if data.get(field) is not None:
+            return fmt(data[field])
+    return result["response"]
+
+
+def evaluate_backend(backend, examples, projects, tasks, equipe_count, filter_period):
+    rows = []
+    for example in examples:
+        request = AnalysisRequest(query=example["question"], projects=projects, tasks=tasks, filterPeriod=filter_period)
+        trace = {}
+        started = time.perf_counter()
+        try:
+            result = run_analysis(request, backend=backend, equipe_count=equipe_count, trace=trace)
+            prediction = result["response"]
+            scored = rule_answer(result) if trace["route"] == "rule" else prediction
+        except HTTPException as e:
+            logger.error(f"Erreur pour '{example['question']}' : {e.detail}")
+            prediction = scored = ""
+            trace["route"] = "error"
+        stages = dict(trace.get("stages", {}))
+        stages["total"] = time.perf_counter() - started
+        stages["rules"] = stages["total"] - sum(stages.get(s, 0.0) for s in ("prepare", "prompt", "generate"))
+        row = {
+            "source": example["source"],
+            "question": example["question"],
+            "answer": example["answer"],
+            "prediction": prediction,
+            "scored": scored,
+            "route": trace["route"],
+            "stages": stages,
+        }
+        if example["answer"] is not None:
+            row["exact_match"] = exact_match(scored, example["answer"])
+            row["f1"] = f1_score(scored, example["answer"])
+        rows.append(row)
+    return rows
+
+
+def summarize(rows):
+    scored = [r for r in rows if "f1" in r]
+    summary = {
+        "examples": len(rows),
+        "rule_hit_rate": float(np.mean([r["route"] == "rule" for r in rows])) if rows else 0.0,
+        "errors": sum(r["route"] == "error" for r in rows),
+    }
+    for route in ("all", "rule", "model"):
+        subset = [r for r in scored if route == "all" or r["route"] == route]
+        summary[f"exact_match_{route}"] = float(np.mean([r["exact_match"] for r in subset])) if subset else None
+        summary[f"f1_{route}"] = float(np.mean([r["f1"] for r in subset])) if subset else None
+    latency = {}
+    for stage in STAGES:
+        values = [r["stages"][stage] * 1000 for r in rows if stage in r["stages"]]
+        if values:
+            latency[stage] = {
+                "mean_ms": float(np.mean(values)),
+                "p50_ms": float(np.percentile(values, 50)),
+                "p95_ms": float(np.percentile(values, 95)),
+            }
+    summary["latency"] = latency
+    return summary
+
+
+def print_report(results):
+    def fmt(value):
+        return "-" if value is None else f"{value:.3f}"
+
+    names = list(results)
+    width = max(24, *(len(n) for n in names))
+    print("\n" + "Métrique".ljust(28) + "".join(n.ljust(width + 2) for n in names))
+    metrics = ["examples", "errors", "rule_hit_rate"] + [f"{m}_{r}" for m in ("exact_match", "f1") for r in ("all", "rule", "model")]
+    for metric in metrics:
+        print(metric.ljust(28) + "".join(fmt(results[n][metric]).ljust(width + 2) for n in names))
+    for stage in STAGES:
+        for stat in ("mean_ms", "p50_ms", "p95_ms"):
+            values = [results[n]["latency"].get(stage, {}).get(stat) for n in names]
+            print(f"{stage}.{stat}".ljust(28) + "".join(fmt(v).ljust(width + 2) for v in values))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Évaluation hors ligne du pipeline /api/ai/analyze (règles + T5)")
+    parser.add_argument("--model", action="append", dest="models", help="Checkpoint ou modèle à comparer (répétable)")
+    parser.add_argument("--num-beams", action="append", type=int, dest="num_beams", help="Nombre de faisceaux (répétable, 1 = glouton)")
+    parser.add_argument("--queries", help="Corpus de requêtes réelles (.txt ou .jsonl)")
+    parser.add_argument("--test-size", type=float, default=TEST_SIZE, help="Fraction du jeu de données retenue pour l'évaluation (celle de train_model.py par défaut)")
+    parser.add_argument("--seed", type=int, default=SPLIT_SEED)
+    parser.add_argument("--filter-period", default="all")
+    parser.add_argument("--output", help="Fichier JSON de sortie (résumé et prédictions)")
+    args = parser.parse_args()
+
+    projects_df, tasks_df, agents_df, equipes_df, statut_projet_df, statut_tache_df, societe_df = extract_data()
+    dataset = prepare_dataset(projects_df, tasks_df, agents_df, equipes_df, statut_projet_df, statut_tache_df, societe_df)
+    held_out = split_dataset(dataset, args.test_size, args.seed)["test"]
+    examples = [{"question": q, "answer": a, "source": "dataset"} for q, a in zip(held_out["question"], held_out["answer"])]
+    if args.queries:
+        examples += load_queries(args.queries)
+    logger.info(f"{len(examples)} exemples à évaluer")
+
+    projects, tasks = build_payload(projects_df, tasks_df, statut_projet_df)
+    results, predictions = {}, {}
+    for model_path in args.models or [DEFAULT_MODEL_PATH]:
+        for num_beams in args.num_beams or [5]:
+            backend = T5Backend(model_path, num_beams=num_beams)
+            rows = evaluate_backend(backend, examples, projects, tasks, len(equipes_df), args.filter_period)
+            results[backend.name] = summarize(rows)
+            predictions[backend.name] = rows
+            del backend
+
+    print_report(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"summary": results, "predictions": predictions}, f, ensure_ascii=False, indent=2)
+        logger.info(f"Rapport écrit dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+from datetime import datetime, timezone
+
+# Configuration par variables d'environnement
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_MAX_MESSAGE = int(os.getenv("LOG_MAX_MESSAGE", "2000"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# Identifiant de la requête HTTP en cours, ajouté à chaque enregistrement
+request_id_var = contextvars.ContextVar("request_id", default=None)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        return json.dumps(data, ensure_ascii=False)
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    # Met les enregistrements en file sans jamais bloquer : message tronqué, rejet si la file est pleine
+    def __init__(self, log_queue, max_message=LOG_MAX_MESSAGE):
+        super().__init__(log_queue)
+        self.max_message = max_message
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Seul le message est tronqué, avant que super().prepare() n'y ajoute la trace d'exception complète
+        message = record.getMessage()
+        if len(message) > self.max_message:
+            record = copy.copy(record)
+            record.msg = f"{message[:self.max_message]}… [{len(message) - self.max_message} caractères tronqués]"
+            record.args = None
+        record = super().prepare(record)
+        record.request_id = request_id_var.get()
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener = None
+_queue_handler = None
+
+
+def configure_logging(level=LOG_LEVEL):
+    # Remplace les handlers racine par une file bornée vidée par un thread d'écriture JSON
+    global _listener, _queue_handler
+    if _listener is not None:
+        return _queue_handler
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(JsonFormatter())
+    _queue_handler = BoundedQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+    root = logging.getLogger()
+    root.handlers = [_queue_handler]
+    root.setLevel(level)
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _queue_handler
+
+
+def stop_logging():
+    # Vide la file puis arrête le thread d'écriture
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def logging_stats():
+    return {
+        "queued": _queue_handler.queue.qsize() if _queue_handler else 0,
+        "dropped": _queue_handler.dropped if _queue_handler else 0,
+    }
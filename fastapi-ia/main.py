@@ -1,32 +1,64 @@
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, ValidationError
 from typing import List, Optional
-from transformers import T5ForConditionalGeneration, T5Tokenizer
+from contextlib import asynccontextmanager
 import pandas as pd
 from sqlalchemy import create_engine
 import logging
 from datetime import datetime
 import os
 import re
-
-# Configuration du logging
-logging.basicConfig(level=logging.DEBUG)
+import time
+import uuid
+
+from admission import AdmissionController, AnswerCache, Overloaded
+from backend import get_backend
+from coalesce import SingleFlight, request_key
+from data_layer import LocalDataLayer, iso_date
+from dataset_cache import Dataset, DatasetCache, VersionConflict, dataset_version
+from log_config import configure_logging, logging_stats, request_id_var, stop_logging
+from profiling import profiler
+from prompt import MAX_LISTED_AGENTS, MAX_LISTED_EQUIPES, bounded_join
+
+# Configuration du logging : file asynchrone bornée, niveau fixé par LOG_LEVEL
+configure_logging()
 logger = logging.getLogger(__name__)
 
+# Chargement du modèle au démarrage de l'application
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    get_backend()
+    # Conversion des CSV en Parquet au démarrage plutôt qu'à la première requête
+    if DATA_SOURCE == "local":
+        await run_in_threadpool(data_layer.sync)
+    yield
+    stop_logging()
+
 # Initialisation de l'application FastAPI
-app = FastAPI(title="Project Management AI API")
+app = FastAPI(title="Project Management AI API", lifespan=lifespan)
 
-# Middleware pour logger les requêtes
+# Profilage opt-in : échantillonnage (PROFILE_SAMPLE_RATE), en-tête X-Profile ou endpoint d'administration
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    if not profiler.should_profile(request.headers):
+        return await call_next(request)
+    with profiler.request():
+        return await call_next(request)
+
+# Middleware pour logger les requêtes (sans décoder le corps) avec un identifiant de requête
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    token = request_id_var.set(request_id)
     try:
-        body = await request.body()
-        logger.debug(f"Requête reçue : {request.url.path} {body.decode('utf-8', errors='ignore')}")
-    except Exception as e:
-        logger.error(f"Erreur lors du log de la requête : {e}")
-    response = await call_next(request)
-    return response
+        logger.debug(f"Requête reçue : {request.method} {request.url.path} ({request.headers.get('content-length', '0')} octets)")
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = request_id
+        return response
+    finally:
+        request_id_var.reset(token)
 
 # Configuration CORS
 app.add_middleware(
@@ -75,21 +107,44 @@ class Equipe(BaseModel):
     nom: Optional[str] = None
     responsable_id: Optional[int] = None
 
+# Les données sont envoyées en ligne (projects/tasks) ou référencées par un datasetId déjà téléversé
 class AnalysisRequest(BaseModel):
     query: str
-    projects: List[Project]
-    tasks: List[Task]
+    projects: Optional[List[Project]] = None
+    tasks: Optional[List[Task]] = None
     agents: Optional[List[Agent]] = []
     equipes: Optional[List[Equipe]] = []
+    datasetId: Optional[str] = None
     filterPeriod: str
     language: str = "fr"
 
 class SuggestQuestionsRequest(BaseModel):
+    projects: Optional[List[Project]] = None
+    tasks: Optional[List[Task]] = None
+    agents: Optional[List[Agent]] = []
+    equipes: Optional[List[Equipe]] = []
+    datasetId: Optional[str] = None
+    language: str = "fr"
+
+class DatasetUpload(BaseModel):
     projects: List[Project]
     tasks: List[Task]
     agents: Optional[List[Agent]] = []
     equipes: Optional[List[Equipe]] = []
-    language: str = "fr"
+
+class ProfilingConfig(BaseModel):
+    sampleRate: Optional[float] = None
+    nextRequests: Optional[int] = None
+
+# baseVersion : version renvoyée par le dernier téléversement ou PATCH, sur laquelle porte le delta
+class DatasetDelta(BaseModel):
+    baseVersion: str
+    projects: List[Project] = []
+    tasks: List[Task] = []
+    deletedProjectIds: List[int] = []
+    deletedTaskIds: List[int] = []
+    agents: Optional[List[Agent]] = None
+    equipes: Optional[List[Equipe]] = None
 
 # Connexion à la base de données
 def connect_db():
@@ -104,8 +159,15 @@ def connect_db():
         logger.error(f"Erreur de connexion à la base de données : {e}")
         raise Exception("Échec de la connexion à la base de données")
 
+# Source des données : base SQL (par défaut) ou cache Parquet local construit depuis ./data (DATA_SOURCE=local)
+DATA_SOURCE = os.getenv("DATA_SOURCE", "sql")
+data_layer = LocalDataLayer()
+
 # Extraction des données
+@profiler.cpu("extract_data")
 def extract_data():
+    if DATA_SOURCE == "local":
+        return data_layer.extract_data()
     engine = connect_db()
     try:
         projects_df = pd.read_sql("SELECT * FROM projet", engine)
@@ -131,6 +193,13 @@ def extract_data():
         logger.error(f"Erreur lors de l'extraction des données : {e}")
         raise
 
+# Nombre d'équipes, sans charger les autres tables
+def count_equipes():
+    if DATA_SOURCE == "local":
+        data_layer.maybe_sync()
+        return len(data_layer.load("equipe", columns=["id"]))
+    return int(pd.read_sql("SELECT COUNT(*) AS total FROM equipe", connect_db())["total"].iloc[0])
+
 # Conversion des données du frontend vers le format interne
 def normalize_project(project: Project):
     return {
@@ -156,32 +225,105 @@ def normalize_task(task: Task):
         "titre": task.titre
     }
 
-# Chargement du modèle
-model_path = "./models/fine_tuned_t5"
-try:
-    if not os.path.exists(model_path):
-        logger.warning(f"Le dossier du modèle fine-tuné {model_path} n'existe pas. Utilisation de google/flan-t5-base.")
-    tokenizer = T5Tokenizer.from_pretrained(
-        model_path if os.path.exists(model_path) else "google/flan-t5-base",
-        legacy=True
+# Déduplication des appels identiques concurrents à /analyze et /suggest-questions
+single_flight = SingleFlight()
+
+# Contrôle d'admission devant le modèle et réponses récentes pour le mode dégradé
+admission = AdmissionController()
+answer_cache = AnswerCache()
+
+# Jeux de données téléversés par les clients, avec leurs index dérivés
+dataset_cache = DatasetCache()
+
+# Lignes normalisées (projets, tâches, agents, équipes) d'une requête ou d'un téléversement
+def dataset_rows(payload):
+    return (
+        [normalize_project(p) for p in payload.projects or []],
+        [normalize_task(t) for t in payload.tasks or []],
+        payload.agents,
+        payload.equipes,
     )
-    model = T5ForConditionalGeneration.from_pretrained(
-        model_path if os.path.exists(model_path) else "google/flan-t5-base"
+
+@profiler.cpu("build_dataset")
+def build_dataset(rows, version=None):
+    return Dataset(*rows, version=version)
+
+# Version des données d'une requête et fonction qui fournit le jeu de données correspondant.
+# Pour les données en ligne, seule l'empreinte est calculée ici : les index pandas sont construits
+# dans le calcul partagé, que les requêtes dupliquées ne refont pas.
+def dataset_source(request):
+    if request.datasetId:
+        dataset = dataset_cache.get(request.datasetId)
+        if dataset is None:
+            raise HTTPException(status_code=404, detail=f"Jeu de données inconnu ou expiré : {request.datasetId}")
+        return dataset.version, lambda: dataset
+    if request.projects is None and request.tasks is None:
+        raise HTTPException(status_code=422, detail="Requête sans données : fournir datasetId ou projects/tasks")
+    rows = dataset_rows(request)
+    version = dataset_version(*rows)
+    return version, lambda: build_dataset(rows, version)
+
+# Jeu de données d'une requête : référencé par datasetId, ou construit à partir des données en ligne
+def resolve_dataset(request):
+    _, load_dataset = dataset_source(request)
+    return load_dataset()
+
+# Contexte général de gestion de projet
+GENERAL_CONTEXT = (
+    "Contexte général : Gestion de projet avec méthodologies Agile (itérations courtes, collaboration client) "
+    "et Waterfall (planification linéaire). Importance de la communication, gestion des risques, motivation des équipes, et suivi des jalons."
+)
+ANALYSIS_INSTRUCTION = "\nInstruction : Répondez en une phrase concise en français, en évitant les réponses vides ou incohérentes."
+
+# Préfixe du prompt d'analyse (tout ce qui précède la question), de taille bornée
+def build_analysis_prefix(period, agents, equipes, equipe_count, current_date, filterPeriod, language):
+    # Informations sur les équipes et agents
+    equipe_info = bounded_join([f"{e.nom} (Responsable ID: {e.responsable_id})" for e in equipes], MAX_LISTED_EQUIPES, "Aucune")
+    agent_info = bounded_join([f"{a.prenom} {a.nom}" for a in agents], MAX_LISTED_AGENTS, "Aucun")
+
+    # Formatter les projets avec le plus de tâches
+    top_projects = [
+        f"{p.nom_projet} ({p.task_count} tâches)"
+        for p in period.projects_with_tasks().head(3).itertuples()
+    ]
+    top_projects_str = ", ".join(top_projects) if top_projects else "Aucun"
+
+    context = (
+        f"{GENERAL_CONTEXT}\n"
+        f"Date actuelle : {current_date}\n"
+        f"Période de filtre : {filterPeriod}\n"
+        f"Total des projets : {len(period.projects)}\n"
+        f"Projets actifs : {len(period.active_projects())}\n"
+        f"Projets terminés : {len(period.completed_projects())}\n"
+        f"Projets en retard : {len(period.delayed_projects())}\n"
+        f"Total des tâches : {len(period.tasks)}\n"
+        f"Tâches en retard : {len(period.delayed_tasks())}\n"
+        f"Équipes : {equipe_info}\n"
+        f"Agents : {agent_info}\n"
+        f"Projets avec le plus de tâches : {top_projects_str}\n"
+        f"Budget total : {period.total_budget():.2f} $\n"
+        f"Total des équipes : {equipe_count} équipes actives\n"
+    )
+    return (
+        f"Langue : {language}\n"
+        f"Contexte : {context}\n"
+        f"Question : "
     )
-    logger.info(f"Modèle chargé depuis : {'fine_tuned_t5' if os.path.exists(model_path) else 'google/flan-t5-base'}")
-except Exception as e:
-    logger.error(f"Erreur lors du chargement du modèle : {e}")
-    raise
 
-@app.post("/api/ai/analyze")
-async def analyze(request: AnalysisRequest):
+# Analyse synchrone (règles puis T5), exécutée hors de la boucle d'événements.
+# `trace` (optionnel) reçoit la route suivie et la durée de chaque étape, pour l'évaluation hors ligne.
+def run_analysis(request: AnalysisRequest, backend=None, equipe_count=None, trace=None, load_dataset=None):
+    trace = {} if trace is None else trace
+    trace["route"] = "rule"
+    trace["stages"] = {}
+    started = time.perf_counter()
     try:
         query = request.query.lower().strip()
         logger.debug(f"Query reçue : {query}")
-        projects = [normalize_project(p) for p in request.projects]
-        tasks = [normalize_task(t) for t in request.tasks]
-        agents = request.agents or []
-        equipes = request.equipes or []
+        dataset = load_dataset() if load_dataset else resolve_dataset(request)
+        projects = dataset.projects
+        agents = dataset.agents
+        equipes = dataset.equipes
         filterPeriod = request.filterPeriod
         language = request.language
 
@@ -193,60 +335,20 @@ async def analyze(request: AnalysisRequest):
         current_date = datetime.now().strftime("%Y-%m-%d")
 
         # Extraire les données de la base pour enrichir le contexte
-        projects_df, tasks_df, agents_df, equipes_df, statut_projet_df, statut_tache_df, societe_df = extract_data()
-
-        # Préparer le contexte
-        delayed_projects = [
-            p for p in projects
-            if p["date_fin"] and p["statut_id"] != "Terminé" and p["date_fin"] < current_date
-        ]
-        completed_projects = [p for p in projects if p["statut_id"] == "Terminé"]
-        delayed_tasks = [
-            t for t in tasks
-            if t["date_fin"] and t["id_statut_tache"] != 3 and t["date_fin"] < current_date
-        ]
-        task_count_by_project = {}
-        for task in tasks:
-            task_count_by_project[task["id_projet"]] = task_count_by_project.get(task["id_projet"], 0) + 1
-        projects_with_tasks = [
-            {"nom_projet": p["nom_projet"], "task_count": task_count_by_project.get(p["id"], 0)}
-            for p in projects
-        ]
-        projects_with_tasks.sort(key=lambda x: x["task_count"], reverse=True)
-
-        # Informations sur les équipes et agents
-        equipe_info = ", ".join(f"{e['nom']} (Responsable ID: {e['responsable_id']})" for e in equipes) if equipes else "Aucune"
-        agent_info = ", ".join(f"{a['prenom']} {a['nom']}" for a in agents) if agents else "Aucun"
-
-        # Contexte général de gestion de projet
-        general_context = (
-            "Contexte général : Gestion de projet avec méthodologies Agile (itérations courtes, collaboration client) "
-            "et Waterfall (planification linéaire). Importance de la communication, gestion des risques, motivation des équipes, et suivi des jalons."
-        )
+        if equipe_count is None:
+            equipe_count = count_equipes()
 
-        # Formatter les projets avec le plus de tâches
-        top_projects = [
-            f"{p['nom_projet']} ({p['task_count']} tâches)"
-            for p in projects_with_tasks[:3]
-        ]
-        top_projects_str = ", ".join(top_projects) if top_projects else "Aucun"
-
-        context = (
-            f"{general_context}\n"
-            f"Date actuelle : {current_date}\n"
-            f"Période de filtre : {filterPeriod}\n"
-            f"Total des projets : {len(projects)}\n"
-            f"Projets actifs : {sum(1 for p in projects if not p['archived'])}\n"
-            f"Projets terminés : {len(completed_projects)}\n"
-            f"Projets en retard : {len(delayed_projects)}\n"
-            f"Total des tâches : {len(tasks)}\n"
-            f"Tâches en retard : {len(delayed_tasks)}\n"
-            f"Équipes : {equipe_info}\n"
-            f"Agents : {agent_info}\n"
-            f"Projets avec le plus de tâches : {top_projects_str}\n"
-            f"Budget total : {sum(p['budget'] for p in projects):.2f} $\n"
-            f"Total des équipes : {len(equipes_df)} équipes actives\n"
-        )
+        # Projets et tâches indexés par date, restreints à la période demandée
+        store = dataset.store
+        try:
+            period = store.for_period(filterPeriod)
+        except ValueError as e:
+            logger.warning(f"{e}. Utilisation de toute la période.")
+            period = store.for_period("all")
+        delayed_projects = period.delayed_projects()
+        completed_projects = period.completed_projects()
+        delayed_tasks = period.delayed_tasks()
+        trace["stages"]["prepare"] = time.perf_counter() - started
 
         # Règles spécifiques
         # 1. Comment motiver l'équipe du projet
@@ -325,18 +427,19 @@ async def analyze(request: AnalysisRequest):
         )
         if task_count_match:
             project_name = task_count_match.group(1).strip()
-            for project in projects_with_tasks:
-                if project["nom_projet"].lower() == project_name.lower():
-                    response = f"Le projet {project['nom_projet']} a {project['task_count']} tâche(s)."
-                    logger.info(f"Réponse directe : {response}")
-                    return {
-                        "response": response,
-                        "structured_data": {
-                            "project_name": project["nom_projet"],
-                            "task_count": project["task_count"],
-                            "type": "task_count"
-                        }
+            project = store.find_project(project_name)
+            if project is not None:
+                task_count = store.task_count(project["id"])
+                response = f"Le projet {project['nom_projet']} a {task_count} tâche(s)."
+                logger.info(f"Réponse directe : {response}")
+                return {
+                    "response": response,
+                    "structured_data": {
+                        "project_name": project["nom_projet"],
+                        "task_count": task_count,
+                        "type": "task_count"
                     }
+                }
             return {
                 "response": f"Aucun projet nommé '{project_name}' trouvé.",
                 "structured_data": None
@@ -344,7 +447,7 @@ async def analyze(request: AnalysisRequest):
 
         # 5. Budget total
         if "budget total" in query and not re.search(r"pour\s+(?:le\s+)?projet", query):
-            total_budget = sum(p["budget"] for p in projects)
+            total_budget = period.total_budget()
             response = f"Le budget total des projets est de {total_budget:.2f} $."
             return {
                 "response": response,
@@ -384,7 +487,7 @@ async def analyze(request: AnalysisRequest):
                 "response": response,
                 "structured_data": {
                     "delayed_projects": len(delayed_projects),
-                    "project_names": [p["nom_projet"] for p in delayed_projects],
+                    "project_names": delayed_projects["nom_projet"].tolist(),
                     "type": "bar"
                 }
             }
@@ -402,7 +505,6 @@ async def analyze(request: AnalysisRequest):
 
         # 9. Nombre total d'équipes
         if "nombre total des equipes" in query or "nombre d'équipes" in query:
-            equipe_count = len(equipes_df)
             response = f"Il y a {equipe_count} équipe(s) active(s)."
             return {
                 "response": response,
@@ -425,25 +527,42 @@ async def analyze(request: AnalysisRequest):
             )
             return {"response": response, "structured_data": {"type": "text"}}
 
-        # Préparer l'entrée pour T5
-        input_text = (
-            f"Langue : {language}\n"
-            f"Contexte : {context}\n"
-            f"Question : {query}\n"
-            f"Instruction : Répondez en une phrase concise en français, en évitant les réponses vides ou incohérentes."
+        # Préparer l'entrée pour T5 : préfixe de contexte mis en cache par version de données
+        trace["route"] = "model"
+        backend = backend or get_backend()
+        prefix_key = (
+            dataset.version, filterPeriod, current_date, equipe_count, language,
         )
 
+        answer_key = (backend.name, prefix_key, query)
+
         try:
-            inputs = tokenizer(input_text, return_tensors="pt", max_length=512, truncation=True)
-            outputs = model.generate(
-                **inputs,
-                max_length=150,
-                num_return_sequences=1,
-                no_repeat_ngram_size=2,
-                num_beams=5,
+            stage_started = time.perf_counter()
+            inputs, dropped = backend.prompt_builder.build(
+                prefix_key,
+                lambda: build_analysis_prefix(period, agents, equipes, equipe_count, current_date, filterPeriod, language),
+                query,
+                ANALYSIS_INSTRUCTION,
             )
-            response = tokenizer.decode(outputs[0], skip_special_tokens=True).strip()
-            logger.info(f"Réponse brute de T5 : {response}")
+            if dropped:
+                logger.warning(f"Contexte tronqué : {dropped} token(s) supprimé(s)")
+            trace["stages"]["prompt"] = time.perf_counter() - stage_started
+            stage_started = time.perf_counter()
+            # Génération soumise au contrôle d'admission (concurrence et file d'attente bornées)
+            with admission.slot():
+                response = backend.generate(inputs, max_length=150)
+            trace["stages"]["generate"] = time.perf_counter() - stage_started
+            logger.debug(f"Réponse brute de T5 : {response}")
+            answer_cache.put(answer_key, response)
+        except Overloaded as e:
+            # Mode dégradé : dernière réponse connue pour cette question, sinon refus immédiat
+            response = answer_cache.get(answer_key)
+            if response is None:
+                logger.warning(f"{e}. Requête refusée.")
+                raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+            admission.record_degraded()
+            trace["route"] = "cache"
+            logger.warning(f"{e}. Réponse en cache renvoyée.")
         except Exception as e:
             logger.error(f"Erreur lors de la génération T5 : {e}")
             response = "Erreur lors de la génération de la réponse."
@@ -459,12 +578,14 @@ async def analyze(request: AnalysisRequest):
         if "projets terminés" in query:
             structured_data = {
                 "completed_projects": len(completed_projects),
-                "project_names": [p["nom_projet"] for p in completed_projects],
+                "project_names": completed_projects["nom_projet"].tolist(),
                 "type": "list"
             }
 
         logger.info(f"Requête : {query}, Réponse : {response}")
         return {"response": response, "structured_data": structured_data}
+    except HTTPException:
+        raise
     except ValidationError as e:
         logger.error(f"Erreur de validation dans /api/ai/analyze : {e.errors()}")
         raise HTTPException(status_code=422, detail=f"Erreur de validation : {e.errors()}")
@@ -472,13 +593,24 @@ async def analyze(request: AnalysisRequest):
         logger.error(f"Erreur dans l'analyse : {e}")
         raise HTTPException(status_code=500, detail=f"Erreur lors de l'analyse : {str(e)}")
 
-@app.post("/api/ai/suggest-questions")
-async def suggest_questions(request: SuggestQuestionsRequest):
+@app.post("/api/ai/analyze")
+async def analyze(request: AnalysisRequest):
+    # Empreinte des données calculée dans le pool de threads ; les requêtes identiques concurrentes
+    # partagent ensuite un seul calcul, construction du jeu de données comprise
+    version, load_dataset = await run_in_threadpool(dataset_source, request)
+    return await single_flight.run(
+        request_key("analyze", version, request.query, request.filterPeriod),
+        lambda: run_in_threadpool(run_analysis, request, load_dataset=load_dataset)
+    )
+
+# Suggestion de questions synchrone, exécutée hors de la boucle d'événements
+def run_suggest_questions(request: SuggestQuestionsRequest, load_dataset=None):
     try:
-        projects = [normalize_project(p) for p in request.projects]
-        tasks = [normalize_task(t) for t in request.tasks]
-        agents = request.agents or []
-        equipes = request.equipes or []
+        dataset = load_dataset() if load_dataset else resolve_dataset(request)
+        projects = dataset.projects
+        tasks = dataset.tasks
+        agents = dataset.agents
+        equipes = dataset.equipes
         language = request.language
 
         if language != "fr":
@@ -488,15 +620,10 @@ async def suggest_questions(request: SuggestQuestionsRequest):
         current_date = datetime.now().strftime("%Y-%m-%d")
 
         # Préparer le contexte
-        delayed_projects = [
-            p for p in projects
-            if p["date_fin"] and p["statut_id"] != "Terminé" and p["date_fin"] < current_date
-        ]
-        completed_projects = [p for p in projects if p["statut_id"] == "Terminé"]
-        delayed_tasks = [
-            t for t in tasks
-            if t["date_fin"] and t["id_statut_tache"] != 3 and t["date_fin"] < current_date
-        ]
+        period = dataset.store.for_period("all")
+        delayed_projects = period.delayed_projects()
+        completed_projects = period.completed_projects()
+        delayed_tasks = period.delayed_tasks()
 
         context = (
             f"Date actuelle : {current_date}\n"
@@ -517,15 +644,16 @@ async def suggest_questions(request: SuggestQuestionsRequest):
             f"Chaque question doit être concise et sur une ligne."
         )
 
-        inputs = tokenizer(input_text, return_tensors="pt", max_length=512, truncation=True)
-        outputs = model.generate(
-            **inputs,
-            max_length=250,
-            num_return_sequences=1,
-            no_repeat_ngram_size=2,
-            num_beams=4
-        )
-        response = tokenizer.decode(outputs[0], skip_special_tokens=True).strip()
+        backend = get_backend()
+        inputs = backend.tokenizer(input_text, return_tensors="pt", max_length=512, truncation=True)
+        try:
+            with admission.slot():
+                response = backend.generate(inputs, max_length=250, num_beams=4)
+        except Overloaded as e:
+            # Mode dégradé : seulement les questions prédéfinies ci-dessous
+            admission.record_degraded()
+            logger.warning(f"{e}. Questions prédéfinies uniquement.")
+            response = ""
 
         suggested_questions = [q.strip() for q in response.split("\n") if q.strip()]
         # Ajouter des questions spécifiques
@@ -538,8 +666,11 @@ async def suggest_questions(request: SuggestQuestionsRequest):
         suggested_questions = list(set(suggested_questions + project_specific_questions + ["Comment motiver les agents ?"]))
         suggested_questions = suggested_questions[:10]  # Limiter à 10 questions
 
-        logger.info(f"Questions suggérées générées : {suggested_questions}")
+        logger.info(f"{len(suggested_questions)} questions suggérées générées")
+        logger.debug(f"Questions suggérées : {suggested_questions}")
         return {"questions": suggested_questions}
+    except HTTPException:
+        raise
     except ValidationError as e:
         logger.error(f"Erreur de validation dans /api/ai/suggest-questions : {e.errors()}")
         raise HTTPException(status_code=422, detail=f"Erreur de validation : {e.errors()}")
@@ -547,33 +678,110 @@ async def suggest_questions(request: SuggestQuestionsRequest):
         logger.error(f"Erreur lors de la génération des questions : {e}")
         raise HTTPException(status_code=500, detail=f"Erreur lors de la génération : {str(e)}")
 
+@app.post("/api/ai/suggest-questions")
+async def suggest_questions(request: SuggestQuestionsRequest):
+    version, load_dataset = await run_in_threadpool(dataset_source, request)
+    return await single_flight.run(
+        request_key("suggest-questions", version),
+        lambda: run_in_threadpool(run_suggest_questions, request, load_dataset=load_dataset)
+    )
+
+# Téléversement unique du jeu de données ; les appels suivants le référencent par datasetId
+@app.post("/api/ai/datasets")
+async def create_dataset(upload: DatasetUpload):
+    dataset = await run_in_threadpool(lambda: build_dataset(dataset_rows(upload)))
+    dataset_id = dataset_cache.add(dataset)
+    logger.info(f"Jeu de données {dataset_id} créé : {len(dataset.projects)} projets, {len(dataset.tasks)} tâches")
+    return {"datasetId": dataset_id, "version": dataset.version, "projects": len(dataset.projects), "tasks": len(dataset.tasks)}
+
+# Envoi des seules lignes modifiées ou supprimées
+@app.patch("/api/ai/datasets/{dataset_id}")
+async def update_dataset(dataset_id: str, delta: DatasetDelta):
+    dataset = dataset_cache.get(dataset_id)
+    if dataset is None:
+        raise HTTPException(status_code=404, detail=f"Jeu de données inconnu ou expiré : {dataset_id}")
+    if dataset.version != delta.baseVersion:
+        raise HTTPException(status_code=409, detail=f"Version de base périmée, version actuelle : {dataset.version}")
+    dataset = await run_in_threadpool(
+        dataset.apply_delta,
+        [normalize_project(p) for p in delta.projects],
+        [normalize_task(t) for t in delta.tasks],
+        delta.deletedProjectIds,
+        delta.deletedTaskIds,
+        delta.agents,
+        delta.equipes,
+    )
+    try:
+        replaced = dataset_cache.replace(dataset_id, dataset, delta.baseVersion)
+    except VersionConflict as e:
+        raise HTTPException(status_code=409, detail=f"Version de base périmée, version actuelle : {e.current_version}")
+    if not replaced:
+        raise HTTPException(status_code=404, detail=f"Jeu de données inconnu ou expiré : {dataset_id}")
+    return {"datasetId": dataset_id, "version": dataset.version, "projects": len(dataset.projects), "tasks": len(dataset.tasks)}
+
+@app.delete("/api/ai/datasets/{dataset_id}")
+async def delete_dataset(dataset_id: str):
+    if not dataset_cache.remove(dataset_id):
+        raise HTTPException(status_code=404, detail=f"Jeu de données inconnu ou expiré : {dataset_id}")
+    return {"deleted": dataset_id}
+
+@app.get("/api/ai/metrics")
+async def metrics():
+    # Cache de préfixes (tokens supprimés par troncature) et déduplication des requêtes
+    return {
+        "prompt": get_backend().prompt_builder.snapshot(),
+        "coalescing": single_flight.snapshot(),
+        "logging": logging_stats(),
+        "datasets": dataset_cache.snapshot(),
+        "admission": admission.snapshot(),
+    }
+
+# Administration du profilage, protégée par PROFILE_TOKEN (désactivée s'il n'est pas défini)
+def check_profile_token(request: Request):
+    if not profiler.token or request.headers.get("X-Admin-Token") != profiler.token:
+        raise HTTPException(status_code=403, detail="Accès refusé")
+
+@app.get("/api/admin/profiling")
+async def get_profiling(request: Request):
+    check_profile_token(request)
+    return profiler.snapshot()
+
+@app.post("/api/admin/profiling")
+async def configure_profiling(config: ProfilingConfig, request: Request):
+    check_profile_token(request)
+    profiler.configure(sample_rate=config.sampleRate, next_requests=config.nextRequests)
+    logger.info(f"Profilage configuré : taux {profiler.sample_rate}, {profiler.remaining} requête(s) à profiler")
+    return profiler.snapshot()
+
 @app.get("/api/projects")
 async def get_projects(useAI: Optional[bool] = False):
     try:
         projects_df, tasks_df, _, _, _, _, societe_df = extract_data()
-        projects = []
-        for _, project in projects_df.iterrows():
-            task_count = len(tasks_df[tasks_df["id_projet"] == project["id"]])
-            if useAI and task_count == 0:
-                continue
-            societe_name = None
-            if "societe_id" in project and project["societe_id"] and not societe_df.empty:
-                societe_columns = societe_df.columns.tolist()
-                for col in ["raisonSociale", "nom", "name", "raison_sociale"]:
-                    if col in societe_columns:
-                        societe_name = societe_df[societe_df["id"] == project["societe_id"]][col].iloc[0] if project["societe_id"] in societe_df["id"].values else None
-                        break
-            projects.append({
-                "id": project["id"],
-                "nomProjet": project["nom_projet"],
-                "dateDebut": str(project.get("date_debut", None)) if project.get("date_debut") else None,
-                "dateFin": str(project.get("date_fin", None)) if project.get("date_fin") else None,
-                "statutProjet": {"nom": project.get("statut_id", "Inconnu")},
-                "budget": project.get("budget", 0.0),
-                "archived": project.get("archived", False),
-                "societe": {"raisonSociale": societe_name},
-                "equipe_id": project.get("equipe_id", None)
-            })
+        # Conversion pandas profilée séparément de l'extraction
+        with profiler.cpu("get_projects"):
+            projects = []
+            for _, project in projects_df.iterrows():
+                task_count = len(tasks_df[tasks_df["id_projet"] == project["id"]])
+                if useAI and task_count == 0:
+                    continue
+                societe_name = None
+                if "societe_id" in project and project["societe_id"] and not societe_df.empty:
+                    societe_columns = societe_df.columns.tolist()
+                    for col in ["raisonSociale", "nom", "name", "raison_sociale"]:
+                        if col in societe_columns:
+                            societe_name = societe_df[societe_df["id"] == project["societe_id"]][col].iloc[0] if project["societe_id"] in societe_df["id"].values else None
+                            break
+                projects.append({
+                    "id": project["id"],
+                    "nomProjet": project["nom_projet"],
+                    "dateDebut": iso_date(project.get("date_debut")),
+                    "dateFin": iso_date(project.get("date_fin")),
+                    "statutProjet": {"nom": project.get("statut_id", "Inconnu")},
+                    "budget": project.get("budget", 0.0),
+                    "archived": project.get("archived", False),
+                    "societe": {"raisonSociale": societe_name},
+                    "equipe_id": project.get("equipe_id", None)
+                })
         logger.info(f"Projets renvoyés : {len(projects)}")
         return projects
     except Exception as e:
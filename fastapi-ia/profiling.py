@@ -0,0 +1,129 @@
+import cProfile
+import contextvars
+import logging
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from log_config import request_id_var
+
+logger = logging.getLogger(__name__)
+
+# Configuration par variables d'environnement (profilage désactivé par défaut)
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+PROFILE_HEADER = "X-Profile"
+
+# Vrai pendant le traitement d'une requête sélectionnée pour le profilage
+_profiling = contextvars.ContextVar("profiling", default=False)
+# Vrai lorsqu'une section cProfile est déjà active (cProfile ne s'imbrique pas)
+_in_cprofile = contextvars.ContextVar("in_cprofile", default=False)
+
+
+class Profiler:
+    # Profilage à la demande ou par échantillonnage ; sans requête sélectionnée, chaque section
+    # se réduit à la lecture d'une ContextVar
+    def __init__(self, directory=PROFILE_DIR, sample_rate=PROFILE_SAMPLE_RATE, token=PROFILE_TOKEN):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.token = token
+        self.remaining = 0
+        self._lock = threading.Lock()
+        self.stats = {"profiled_requests": 0, "files": 0}
+
+    def should_profile(self, headers):
+        if self.token and headers.get(PROFILE_HEADER) == self.token:
+            return True
+        if self.remaining:
+            with self._lock:
+                if self.remaining > 0:
+                    self.remaining -= 1
+                    return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def configure(self, sample_rate=None, next_requests=None):
+        with self._lock:
+            if sample_rate is not None:
+                self.sample_rate = sample_rate
+            if next_requests is not None:
+                self.remaining = next_requests
+
+    @contextmanager
+    def request(self):
+        with self._lock:
+            self.stats["profiled_requests"] += 1
+        token = _profiling.set(True)
+        try:
+            yield
+        finally:
+            _profiling.reset(token)
+
+    def _path(self, name, extension):
+        os.makedirs(self.directory, exist_ok=True)
+        # L'identifiant vient de l'en-tête X-Request-ID : assaini et borné avant d'en faire un nom de fichier
+        request_id = re.sub(r"[^\w-]", "_", request_id_var.get() or "hors-requete")[:64]
+        with self._lock:
+            self.stats["files"] += 1
+            sequence = self.stats["files"]
+        return os.path.join(self.directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{sequence:05d}_{request_id}_{name}.{extension}")
+
+    @contextmanager
+    def cpu(self, name):
+        # cProfile autour d'un bloc ; fichier .prof lisible par snakeviz, flameprof ou gprof2dot
+        if not _profiling.get() or _in_cprofile.get():
+            yield
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Un autre profileur est déjà actif sur ce thread
+            yield
+            return
+        token = _in_cprofile.set(True)
+        try:
+            yield
+        finally:
+            profile.disable()
+            _in_cprofile.reset(token)
+            # Un échec d'écriture du profil ne doit pas faire échouer la requête profilée
+            try:
+                path = self._path(name, "prof")
+                profile.dump_stats(path)
+                logger.info(f"Profil CPU écrit : {path}")
+            except Exception as e:
+                logger.error(f"Erreur lors de l'écriture du profil CPU {name} : {e}")
+
+    @contextmanager
+    def torch(self, name):
+        # Trace torch.profiler (format Chrome trace, ouvrable dans Perfetto ou speedscope)
+        if not _profiling.get():
+            yield
+            return
+        from torch.profiler import ProfilerActivity, profile
+
+        with profile(activities=[ProfilerActivity.CPU], record_shapes=True) as prof:
+            yield
+        try:
+            path = self._path(name, "json")
+            prof.export_chrome_trace(path)
+            logger.info(f"Trace torch écrite : {path}")
+        except Exception as e:
+            logger.error(f"Erreur lors de l'écriture de la trace torch {name} : {e}")
+
+    def snapshot(self):
+        files = sorted(os.listdir(self.directory)) if os.path.isdir(self.directory) else []
+        return dict(
+            self.stats,
+            sample_rate=self.sample_rate,
+            remaining=self.remaining,
+            directory=self.directory,
+            recent_files=files[-20:],
+        )
+
+
+profiler = Profiler()
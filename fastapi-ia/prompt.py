@@ -0,0 +1,94 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import torch
+
+# Nombre maximal d'éléments listés nommément dans le contexte
+MAX_LISTED_AGENTS = 20
+MAX_LISTED_EQUIPES = 10
+
+
+def bounded_join(items, limit, empty):
+    # Jointure limitée à `limit` éléments, suivie du nombre d'éléments omis
+    if not items:
+        return empty
+    text = ", ".join(items[:limit])
+    if len(items) > limit:
+        text += f" (+{len(items) - limit} autres)"
+    return text
+
+
+class PromptBuilder:
+    # Construit les entrées T5 : préfixe de contexte tokenisé une fois par version de données,
+    # puis seuls les tokens de la question sont ajoutés à chaque requête
+    def __init__(self, tokenizer, max_length=512, cache_size=64):
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+        self.cache_size = cache_size
+        self._prefixes = OrderedDict()
+        self._suffixes = {}
+        # Préfixes en cours de construction : les appels concurrents pour la même clé attendent le premier
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "waits": 0, "truncated": 0, "dropped_tokens": 0}
+
+    def _encode(self, text):
+        return self.tokenizer.encode(text, add_special_tokens=False)
+
+    def prefix_ids(self, key, build_prefix):
+        with self._lock:
+            ids = self._prefixes.get(key)
+            if ids is not None:
+                self._prefixes.move_to_end(key)
+                self.stats["hits"] += 1
+                return ids
+            pending = self._pending.get(key)
+            if pending is None:
+                self.stats["misses"] += 1
+                self._pending[key] = future = Future()
+            else:
+                self.stats["waits"] += 1
+        if pending is not None:
+            return pending.result()
+        try:
+            ids = self._encode(build_prefix())
+        except BaseException as e:
+            with self._lock:
+                del self._pending[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._prefixes[key] = ids
+            del self._pending[key]
+            while len(self._prefixes) > self.cache_size:
+                self._prefixes.popitem(last=False)
+        future.set_result(ids)
+        return ids
+
+    def suffix_ids(self, text):
+        ids = self._suffixes.get(text)
+        if ids is None:
+            ids = self._suffixes[text] = self._encode(text)
+        return ids
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, cached_prefixes=len(self._prefixes))
+
+    def build(self, key, build_prefix, question, suffix=""):
+        # Retourne (inputs, tokens_supprimés) ; le contexte est tronqué avant la question
+        prefix = self.prefix_ids(key, build_prefix)
+        tail = self._encode(question) + self.suffix_ids(suffix) + [self.tokenizer.eos_token_id]
+        budget = self.max_length - len(tail)
+        if budget < 0:
+            ids = tail[:self.max_length - 1] + [self.tokenizer.eos_token_id]
+        else:
+            ids = prefix[:budget] + tail
+        dropped = len(prefix) + len(tail) - len(ids)
+        if dropped:
+            with self._lock:
+                self.stats["truncated"] += 1
+                self.stats["dropped_tokens"] += dropped
+        input_ids = torch.tensor([ids], dtype=torch.long)
+        return {"input_ids": input_ids, "attention_mask": torch.ones_like(input_ids)}, dropped
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import re
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+# Statuts considérés comme terminés
+STATUT_PROJET_TERMINE = "Terminé"
+STATUT_TACHE_TERMINEE = 3
+
+PROJECT_COLUMNS = ["id", "nom_projet", "date_debut", "date_fin", "statut_id", "budget", "archived", "societe_id", "equipe_id"]
+TASK_COLUMNS = ["id", "id_projet", "date_debut", "date_fin", "id_statut_tache", "assigne", "titre"]
+
+# Périodes relatives acceptées par filterPeriod (en jours)
+RELATIVE_PERIODS = {
+    "week": 7,
+    "semaine": 7,
+    "7days": 7,
+    "30days": 30,
+    "90days": 90,
+    "year": 365,
+    "annee": 365,
+}
+
+# Plage personnalisée : "2025-01-01:2025-03-31" ou "2025-01-01/2025-03-31"
+CUSTOM_RANGE_PATTERN = re.compile(r"^\s*(\d{4}-\d{2}-\d{2})?\s*[:/]\s*(\d{4}-\d{2}-\d{2})?\s*$")
+
+
+def data_version(*collections):
+    # Empreinte stable des données reçues, utilisée comme clé de cache
+    payload = json.dumps(collections, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def parse_dates(values):
+    # Conversion unique des dates ISO en datetime64 (naïf, UTC) ; les valeurs invalides deviennent NaT
+    parsed = pd.to_datetime(pd.Series(values, dtype="object"), errors="coerce", utc=True, format="ISO8601")
+    return parsed.dt.tz_convert(None)
+
+
+def period_bounds(filter_period, today):
+    # Retourne (début, fin) inclusifs de la période, ou None pour "all"
+    period = (filter_period or "all").strip().lower()
+    if period in ("", "all", "toutes", "tout"):
+        return None
+    if period in RELATIVE_PERIODS:
+        return today - timedelta(days=RELATIVE_PERIODS[period]), today
+    if period in ("month", "mois"):
+        return today.replace(day=1), today
+    if period in ("quarter", "trimestre"):
+        return today.replace(month=3 * ((today.month - 1) // 3) + 1, day=1), today
+    custom = CUSTOM_RANGE_PATTERN.match(period)
+    if custom and (custom.group(1) or custom.group(2)):
+        start = pd.Timestamp(custom.group(1)) if custom.group(1) else None
+        end = pd.Timestamp(custom.group(2)) if custom.group(2) else None
+        return start, end
+    raise ValueError(f"Période de filtre inconnue : {filter_period}")
+
+
+class DateIndexedFrame:
+    # Lignes triées par date de début pour filtrer une période par chevauchement d'intervalle :
+    # une ligne appartient à [start, end] si date_debut <= end et date_fin >= start, une date manquante
+    # laissant l'intervalle ouvert de ce côté. Les lignes sans aucune date sont exclues des plages datées.
+    def __init__(self, df):
+        df = df.reset_index(drop=True)
+        df["date_debut"] = parse_dates(df["date_debut"])
+        df["date_fin"] = parse_dates(df["date_fin"])
+        undated = df["date_debut"].isna() & df["date_fin"].isna()
+        keys = pd.DataFrame({"undated": undated, "start": df["date_debut"].fillna(pd.Timestamp.min)})
+        self.df = df.loc[keys.sort_values(["undated", "start"], kind="stable").index].reset_index(drop=True)
+        self._dated_count = int((~undated).sum())
+        dated = self.df.iloc[:self._dated_count]
+        self._starts = dated["date_debut"].fillna(pd.Timestamp.min).to_numpy(dtype="datetime64[ns]")
+        self._ends = dated["date_fin"].to_numpy(dtype="datetime64[ns]")
+
+    def between(self, start, end):
+        # Recherche binaire sur les débuts (date_debut <= end), puis test vectorisé des fins sur cette tranche
+        hi = self._dated_count if end is None else np.searchsorted(self._starts, np.datetime64(end, "ns") + np.timedelta64(1, "D"), side="left")
+        candidates = self.df.iloc[:hi]
+        if start is None:
+            return candidates
+        ends = self._ends[:hi]
+        return candidates[np.isnat(ends) | (ends >= np.datetime64(start, "ns"))]
+
+
+class ProjectStore:
+    # Projets et tâches normalisés, indexés par date, avec compteurs vectorisés
+    def __init__(self, projects, tasks):
+        self._projects = DateIndexedFrame(pd.DataFrame(projects, columns=PROJECT_COLUMNS))
+        self._tasks = DateIndexedFrame(pd.DataFrame(tasks, columns=TASK_COLUMNS))
+        self._projects.df["budget"] = pd.to_numeric(self._projects.df["budget"], errors="coerce").fillna(0.0)
+        self._projects.df["archived"] = self._projects.df["archived"].astype("boolean").fillna(False).astype(bool)
+        self.projects = self._projects.df
+        self.tasks = self._tasks.df
+
+    def for_period(self, filter_period):
+        # Vue (projets, tâches) restreinte à la période demandée, relative à la date du jour
+        today = pd.Timestamp.now().normalize()
+        bounds = period_bounds(filter_period, today)
+        if bounds is None:
+            return PeriodView(self.projects, self.tasks, today)
+        start, end = bounds
+        # Tâches de la période restreintes aux projets retenus : les compteurs décrivent le même ensemble
+        projects = self._projects.between(start, end)
+        tasks = self._tasks.between(start, end)
+        return PeriodView(projects, tasks[tasks["id_projet"].isin(projects["id"])], today)
+
+    def find_project(self, name):
+        matches = self.projects[self.projects["nom_projet"].str.lower() == name.lower()]
+        return None if matches.empty else matches.iloc[0]
+
+    def task_count(self, project_id):
+        return int((self.tasks["id_projet"] == project_id).sum())
+
+
+class PeriodView:
+    def __init__(self, projects, tasks, today):
+        self.projects = projects
+        self.tasks = tasks
+        self.today = today
+
+    def delayed_projects(self):
+        p = self.projects
+        return p[p["date_fin"].notna() & (p["statut_id"] != STATUT_PROJET_TERMINE) & (p["date_fin"] < self.today)]
+
+    def completed_projects(self):
+        return self.projects[self.projects["statut_id"] == STATUT_PROJET_TERMINE]
+
+    def active_projects(self):
+        return self.projects[~self.projects["archived"]]
+
+    def delayed_tasks(self):
+        t = self.tasks
+        return t[t["date_fin"].notna() & (t["id_statut_tache"] != STATUT_TACHE_TERMINEE) & (t["date_fin"] < self.today)]
+
+    def total_budget(self):
+        return float(self.projects["budget"].sum())
+
+    def projects_with_tasks(self):
+        # Nombre de tâches de la période par projet, trié par ordre décroissant
+        counts = self.tasks["id_projet"].value_counts()
+        result = pd.DataFrame({
+            "nom_projet": self.projects["nom_projet"].to_numpy(),
+            "task_count": self.projects["id"].map(counts).fillna(0).astype(int).to_numpy(),
+        })
+        return result.sort_values("task_count", ascending=False, kind="stable")
@@ -7,6 +7,8 @@ from datetime import datetime
 import glob
 import gc
 
+from data_layer import LocalDataLayer, iso_date
+
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
 logging.getLogger("urllib3").setLevel(logging.WARNING)
@@ -22,19 +24,11 @@ class LogCallback(TrainerCallback):
     def on_train_end(self, args, state, control, **kwargs):
         logger.info("Fin de l'entraînement du modèle")
 
-# Extraction des données à partir de fichiers CSV
+# Extraction des données à partir de fichiers CSV, via le cache Parquet local
 def extract_data():
     try:
         data_dir = "./data"  # Remplacez par le chemin de vos fichiers CSV
-        projects_df = pd.read_csv(os.path.join(data_dir, "projet.csv"))
-        tasks_df = pd.read_csv(os.path.join(data_dir, "tache_projet.csv"))
-        agents_df = pd.read_csv(os.path.join(data_dir, "agent.csv"))
-        equipes_df = pd.read_csv(os.path.join(data_dir, "equipe.csv"))
-        statut_projet_df = pd.read_csv(os.path.join(data_dir, "statut_projet.csv")) if os.path.exists(os.path.join(data_dir, "statut_projet.csv")) else pd.DataFrame()
-        statut_tache_df = pd.read_csv(os.path.join(data_dir, "statut_tache.csv")) if os.path.exists(os.path.join(data_dir, "statut_tache.csv")) else pd.DataFrame()
-        societe_df = pd.read_csv(os.path.join(data_dir, "societe.csv")) if os.path.exists(os.path.join(data_dir, "societe.csv")) else pd.DataFrame()
-        logger.info(f"Données extraites : {len(projects_df)} projets, {len(tasks_df)} tâches, {len(agents_df)} agents, {len(equipes_df)} équipes")
-        return projects_df, tasks_df, agents_df, equipes_df, statut_projet_df, statut_tache_df, societe_df
+        return LocalDataLayer(data_dir).extract_data()
     except Exception as e:
         logger.error(f"Erreur lors de l'extraction des données : {e}")
         raise
@@ -102,7 +96,7 @@ def prepare_dataset(projects_df, tasks_df, agents_df, equipes_df, statut_projet_
             f"Projet : {project['nom_projet']}, "
             f"Statut : {statut_name}, "
             f"Budget : {project.get('budget', 0.0):.2f}, "
-            f"Dates : {project.get('date_debut', 'N/A')} à {project.get('date_fin', 'N/A')}, "
+            f"Dates : {iso_date(project.get('date_debut')) or 'N/A'} à {iso_date(project.get('date_fin')) or 'N/A'}, "
             f"Tâches : {task_count}, "
             f"Tâches en retard : {delayed_tasks}, "
             f"Équipe : {equipe_name}, "
@@ -196,6 +190,14 @@ def prepare_dataset(projects_df, tasks_df, agents_df, equipes_df, statut_projet_
     })
     return dataset
 
+# Séparation entraînement / évaluation, partagée avec evaluate_model.py : les exemples retenus
+# pour l'évaluation ne sont jamais vus pendant l'entraînement
+TEST_SIZE = 0.2
+SPLIT_SEED = 42
+
+def split_dataset(dataset, test_size=TEST_SIZE, seed=SPLIT_SEED):
+    return dataset.train_test_split(test_size=test_size, seed=seed)
+
 # Tokenisation des données
 def tokenize_function(examples):
     tokenizer = T5Tokenizer.from_pretrained("google/flan-t5-base", legacy=True)
@@ -210,6 +212,8 @@ def train_model():
     try:
         projects_df, tasks_df, agents_df, equipes_df, statut_projet_df, statut_tache_df, societe_df = extract_data()
         dataset = prepare_dataset(projects_df, tasks_df, agents_df, equipes_df, statut_projet_df, statut_tache_df, societe_df)
+        dataset = split_dataset(dataset)["train"]
+        logger.info(f"{len(dataset)} exemples d'entraînement (fraction d'évaluation : {TEST_SIZE})")
         tokenizer = T5Tokenizer.from_pretrained("google/flan-t5-base", legacy=True)
         logger.info("Début de la tokenisation du jeu de données")
         tokenized_dataset = dataset.map(tokenize_function, batched=True)
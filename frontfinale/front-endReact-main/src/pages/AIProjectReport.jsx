@@ -5,6 +5,7 @@ import {
 import { tokens } from '../theme';
 import Header from '../components/Header';
 import SendIcon from '@mui/icons-material/Send';
+import { uploadDataset, deleteDataset, postWithDataset } from '../servises/AIDatasetService';
 
 const AIProjectReport = () => {
   const theme = useTheme();
@@ -18,6 +19,7 @@ const AIProjectReport = () => {
   const [error, setError] = useState(null);
   const [projects, setProjects] = useState([]);
   const [tasks, setTasks] = useState([]);
+  const [datasetId, setDatasetId] = useState(null);
 
   // Simulated fetch for projects
   const fetchProjects = async () => {
@@ -54,14 +56,12 @@ const AIProjectReport = () => {
   const fetchSuggestedQuestions = async () => {
     setLoading(true);
     try {
-      const requestData = { projects, tasks, agents: [], equipes: [], language: 'fr' };
-      const res = await fetch('http://localhost:8000/api/ai/suggest-questions', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify(requestData)
-      });
-      if (!res.ok) throw new Error(`Erreur HTTP : ${res.status}`);
-      const data = await res.json();
+      // Téléverser les données une fois, puis ne plus envoyer que le datasetId ;
+      // le jeu de données précédent (projets ou tâches rechargés) est libéré côté serveur
+      if (datasetId) await deleteDataset(datasetId);
+      const uploadedId = await uploadDataset({ projects, tasks });
+      const { data, datasetId: currentId } = await postWithDataset('suggest-questions', { language: 'fr' }, uploadedId, { projects, tasks });
+      setDatasetId(currentId);
       const questions = data.questions || [];
       setQuestions(questions.slice(0, 2));
       setFilteredQuestions(questions.slice(0, 2));
@@ -82,14 +82,9 @@ const AIProjectReport = () => {
     setMessages([...messages, { role: 'user', content: userQuery }]);
 
     try {
-      const requestData = { query: userQuery, projects, tasks, agents: [], equipes: [], filterPeriod: 'all', language: 'fr' };
-      const res = await fetch('http://localhost:8000/api/ai/analyze', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify(requestData)
-      });
-      if (!res.ok) throw new Error(`Erreur HTTP : ${res.status}`);
-      const data = await res.json();
+      const requestData = { query: userQuery, filterPeriod: 'all', language: 'fr' };
+      const { data, datasetId: currentId } = await postWithDataset('analyze', requestData, datasetId, { projects, tasks });
+      setDatasetId(currentId);
       let responseText = data.response || "Aucune réponse pertinente reçue.";
       if (responseText.includes("Erreur") || responseText.includes("Désolé")) {
         responseText = "La réponse n'est pas disponible. Essayez de reformuler votre question.";
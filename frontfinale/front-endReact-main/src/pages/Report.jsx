@@ -13,9 +13,29 @@ import jsPDF from 'jspdf';
 import html2canvas from 'html2canvas';
 import autoTable from 'jspdf-autotable';
 import { useTranslation } from 'react-i18next';
+import { uploadDataset, deleteDataset, postWithDataset } from '../servises/AIDatasetService';
 
 ChartJS.register(CategoryScale, LinearScale, BarElement, Title, Tooltip, Legend);
 
+// Format attendu par l'API IA
+const normalizeProjects = (projects) => projects.map(project => ({
+  id: parseInt(project.id, 10) || 0,
+  nomProjet: project.nomProjet || 'Projet inconnu',
+  dateDebut: project.dateDebut || null,
+  dateFin: project.dateFin || null,
+  statutProjet: project.statutProjet ? { nom: project.statutProjet.nom || 'Inconnu' } : null,
+  budget: parseFloat(project.budget) || 0.0,
+  archived: !!project.archived,
+  societe: project.societe ? { raisonSociale: project.societe.raisonSociale || 'Inconnu' } : null,
+}));
+
+const normalizeTasks = (tasks) => tasks.map(task => ({
+  id: parseInt(task.id, 10) || 0,
+  idProjet: parseInt(task.idProjet, 10) || 0,
+  dateFin: task.dateFin || null,
+  idStatutTache: parseInt(task.idStatutTache, 10) || 0,
+}));
+
 const Report = () => {
   const { t } = useTranslation();
   const theme = useTheme();
@@ -31,6 +51,10 @@ const Report = () => {
   const [structuredData, setStructuredData] = useState(null);
   const [suggestedQuestions, setSuggestedQuestions] = useState([]);
   const [snackbar, setSnackbar] = useState({ open: false, message: '', severity: 'error' });
+  const [datasetId, setDatasetId] = useState(null);
+
+  // Jeu de données complet (non filtré) pour l'IA ; retéléversé par postWithDataset s'il a expiré
+  const aiDataset = () => ({ projects: normalizeProjects(projects), tasks: normalizeTasks(tasks) });
 
   const fetchData = async () => {
     try {
@@ -44,6 +68,20 @@ const Report = () => {
       setProjects(projectsResponse.data);
       setTasks(tasksResponse.data);
       setLoading(false);
+      // Téléverser les données une seule fois ; les requêtes IA suivantes n'envoient que le datasetId
+      try {
+        if (datasetId) await deleteDataset(datasetId);
+        setDatasetId(await uploadDataset({
+          projects: normalizeProjects(projectsResponse.data),
+          tasks: normalizeTasks(tasksResponse.data),
+        }));
+      } catch (err) {
+        setSnackbar({
+          open: true,
+          message: `${t('Erreur lors du téléversement des données IA : ')} ${err.response?.data?.detail || err.message}`,
+          severity: 'error',
+        });
+      }
     } catch (err) {
       let errorMessage = t('Erreur lors de la récupération des données.');
       if (err.code === 'ERR_NETWORK') {
@@ -60,36 +98,13 @@ const Report = () => {
 
   const fetchSuggestedQuestions = async () => {
     try {
-      const normalizedProjects = getFilteredProjects().map(project => ({
-        id: parseInt(project.id, 10) || 0,
-        nomProjet: project.nomProjet || 'Projet inconnu',
-        dateDebut: project.dateDebut || null,
-        dateFin: project.dateFin || null,
-        statutProjet: project.statutProjet ? { nom: project.statutProjet.nom || 'Inconnu' } : null,
-        budget: parseFloat(project.budget) || 0.0,
-        archived: !!project.archived,
-        societe: project.societe ? { raisonSociale: project.societe.raisonSociale || 'Inconnu' } : null,
-      }));
-
-      const normalizedTasks = tasks.map(task => ({
-        id: parseInt(task.id, 10) || 0,
-        idProjet: parseInt(task.idProjet, 10) || 0,
-        dateFin: task.dateFin || null,
-        idStatutTache: parseInt(task.idStatutTache, 10) || 0,
-      }));
-
-      const payload = {
-        projects: normalizedProjects,
-        tasks: normalizedTasks,
-        language: 'fr',
-      };
-
-      const response = await axios.post('http://localhost:8000/api/ai/suggest-questions', payload);
-      let questions = response.data.questions || [];
+      const { data, datasetId: currentId } = await postWithDataset('suggest-questions', { language: 'fr' }, datasetId, aiDataset());
+      setDatasetId(currentId);
+      let questions = data.questions || [];
       if (!Array.isArray(questions)) {
         throw new Error(t('Les questions suggérées ne sont pas au format attendu.'));
       }
-      const projectSpecificQuestions = normalizedProjects.flatMap(project => [
+      const projectSpecificQuestions = normalizeProjects(getFilteredProjects()).flatMap(project => [
         `Comment motiver l'équipe du projet ${project.nomProjet} ?`,
         `Comment gérer les retards du projet ${project.nomProjet} ?`
       ]);
@@ -113,11 +128,12 @@ const Report = () => {
     fetchData();
   }, []);
 
+  // Le jeu de données est déjà côté serveur : un changement de période n'envoie que le datasetId
   useEffect(() => {
-    if (projects.length > 0 || tasks.length > 0) {
+    if (datasetId) {
       fetchSuggestedQuestions();
     }
-  }, [projects, tasks, filterPeriod]);
+  }, [datasetId, filterPeriod]);
 
   const getFilteredProjects = () => {
     const today = new Date();
@@ -184,35 +200,12 @@ const Report = () => {
       return;
     }
     try {
-      const normalizedProjects = filteredProjects.map(project => ({
-        id: parseInt(project.id, 10) || 0,
-        nomProjet: project.nomProjet || 'Projet inconnu',
-        dateDebut: project.dateDebut || null,
-        dateFin: project.dateFin || null,
-        statutProjet: project.statutProjet ? { nom: project.statutProjet.nom || 'Inconnu' } : null,
-        budget: parseFloat(project.budget) || 0.0,
-        archived: !!project.archived,
-        societe: project.societe ? { raisonSociale: project.societe.raisonSociale || 'Inconnu' } : null,
-      }));
-
-      const normalizedTasks = tasks.map(task => ({
-        id: parseInt(task.id, 10) || 0,
-        idProjet: parseInt(task.idProjet, 10) || 0,
-        dateFin: task.dateFin || null,
-        idStatutTache: parseInt(task.idStatutTache, 10) || 0,
-      }));
-
-      const payload = {
-        query: aiQuery,
-        projects: normalizedProjects,
-        tasks: normalizedTasks,
-        filterPeriod,
-        language: 'fr',
-      };
-
-      const response = await axios.post('http://localhost:8000/api/ai/analyze', payload);
-      setAiResponse(response.data.response || t('Aucune réponse disponible.'));
-      setStructuredData(response.data.structured_data || null);
+      // Seuls la question, la période et le datasetId sont envoyés ; le serveur filtre par période
+      const requestData = { query: aiQuery, filterPeriod, language: 'fr' };
+      const { data, datasetId: currentId } = await postWithDataset('analyze', requestData, datasetId, aiDataset());
+      setDatasetId(currentId);
+      setAiResponse(data.response || t('Aucune réponse disponible.'));
+      setStructuredData(data.structured_data || null);
       setSnackbar({ open: true, message: t('Analyse IA effectuée.'), severity: 'success' });
     } catch (err) {
       setAiResponse(t('Erreur lors de l\'analyse IA.'));
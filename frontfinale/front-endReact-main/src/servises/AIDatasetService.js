@@ -0,0 +1,32 @@
+import axios from "axios";
+
+const base = "http://localhost:8000/api/ai";
+
+// Téléverse projets et tâches une seule fois ; les requêtes suivantes n'envoient que le datasetId
+export const uploadDataset = async ({ projects, tasks, agents = [], equipes = [] }) => {
+    const rep = await axios.post(`${base}/datasets`, { projects, tasks, agents, equipes });
+    return rep.data.datasetId;
+};
+
+// Libère un jeu de données devenu obsolète ; déjà évincé côté serveur (404), il n'y a rien à faire
+export const deleteDataset = async (datasetId) => {
+    try {
+        await axios.delete(`${base}/datasets/${datasetId}`);
+    } catch (error) {
+        if (error.response?.status !== 404) throw error;
+    }
+};
+
+// POST référençant le jeu de données ; s'il a été évincé côté serveur (404), il est téléversé à nouveau
+export const postWithDataset = async (path, body, datasetId, dataset) => {
+    if (!datasetId) datasetId = await uploadDataset(dataset);
+    try {
+        const rep = await axios.post(`${base}/${path}`, { ...body, datasetId });
+        return { data: rep.data, datasetId };
+    } catch (error) {
+        if (error.response?.status !== 404) throw error;
+        const newDatasetId = await uploadDataset(dataset);
+        const rep = await axios.post(`${base}/${path}`, { ...body, datasetId: newDatasetId });
+        return { data: rep.data, datasetId: newDatasetId };
+    }
+};